@@ -1,5 +1,13 @@
 import socket
+import ssl
 import os
+import re
+import select
+import struct
+import time
+import ctypes
+import ctypes.util
+import argparse
 import dns.query
 import dns.update
 import dns.resolver
@@ -9,64 +17,264 @@ import logging
 import paramiko
 import configparser
 import smtplib
+from dataclasses import dataclass
+from types import MappingProxyType
 from email.message import EmailMessage
 from email.utils import formatdate
 
 """
 DNS_Failover
-Version: 1.5.0
+Version: 1.7.0
 Author: Andreas Günther, github@it-linuxmaker.com
 License: GNU General Public License v3.0 or later
 """
 
 config_path = os.getenv("DNSFAILOVER_CONFIG", "/usr/local/etc/dnsfailover/config.cfg")
 
-config = configparser.ConfigParser()
-config.read(config_path)
-
-if not config.sections():
-    raise FileNotFoundError(f"Configuration file {config_path} is empty or unreadable.")
-
-zone1 = config['ZONES']['zone1']
-zone2 = config['ZONES']['zone2']
-
-mxip1 = config['MX']['mxip1']
-mxip2 = config['MX']['mxip2']
-mx1 = config['MX']['mx1']
-mx2 = config['MX']['mx2']
-ns = config['SETTINGS']['ns']
-
-record_mx = config['RECORDS']['record_mx']
-record_smtp = config['RECORDS']['record_smtp']
-record_imap = config['RECORDS']['record_imap']
-record_mail = config['RECORDS']['record_mail']
-record_pop3 = config['RECORDS']['record_pop3']
-
-smtp = int(config['PORTS']['smtp'])
-imaps = int(config['PORTS']['imaps'])
-https = int(config['PORTS']['https'])
-mysql = int(config['PORTS']['mysql'])
-port1 = int(config['PORTS']['port1'])
-port2 = int(config['PORTS']['port2'])
-
-ttl = int(config['SETTINGS']['ttl'])
-
-logfile = config['SETTINGS']['logfile']
-space_limit = int(config['SETTINGS']['space_limit'])
-partition = config['SETTINGS']['partition']
-user = config['SETTINGS']['user']
-
-mailcfg = config['MAIL']
-mail_port = int(mailcfg.get('port', 25))
-mail_use_tls = mailcfg.getboolean('use_tls', fallback=False)
-mail_from = mailcfg['sender_email']
-mail_to = mailcfg['recipient_email']
-mail_username = mailcfg.get('username')
-mail_password = mailcfg.get('password')
+# Display names of the well-known service checks in the [PORTS] section
+SERVICE_NAMES = {'smtp': 'SMTP', 'imaps': 'IMAPs', 'https': 'HTTPs', 'mysql': 'MySQL'}
+
+# Services in [PORTS] that are checked with a TLS handshake if [TLS] services is not set
+TLS_SERVICES = ('imaps', 'https')
+
+# Raised if the configuration file is readable but contains invalid values
+class ConfigError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Host:
+    name: str
+    ip: str
+    ssh_port: int
+
+@dataclass(frozen=True)
+class Check:
+    service: str
+    port: int
+
+@dataclass(frozen=True)
+class MailSettings:
+    sender_email: str
+    recipient_email: str
+    port: int
+    use_tls: bool
+    username: str
+    password: str
+
+@dataclass(frozen=True)
+class TlsSettings:
+    checks: tuple           # service checks that get a TLS handshake
+    expiry_days: int
+    max_handshake: float    # seconds
+    server_name: str        # SNI and certificate name; None uses the host name (mx1, mx2)
+    cafile: str
+
+# Compiled, immutable configuration. A monitoring cycle works on one snapshot from start to end.
+@dataclass(frozen=True)
+class FailoverConfig:
+    path: str
+    hosts: tuple            # (primary, standby)
+    zones: MappingProxyType # zone -> tuple of records that are switched as CNAME
+    records: MappingProxyType
+    checks: tuple
+    ns: str
+    ttl: int
+    logfile: str
+    space_limit: int
+    partition: str
+    user: str
+    mail: MailSettings
+    tls: TlsSettings
+
+    @property
+    def primary_zone(self):
+        return next(iter(self.zones))
+
+    @property
+    def mx_record(self):
+        return self.records['record_mx']
+
+# Reads a value from the config and collects an error instead of failing on the first one.
+# Optional keys pass a default, all other keys are required.
+def _get(config, section, key, errors, convert=str, valid=None, default=None):
+    if section not in config or key not in config[section] or not config[section][key].strip():
+        if default is None:
+            errors.append(f"[{section}] {key} is missing.")
+        return default
+    raw = config[section][key].strip()
+    try:
+        value = convert(raw)
+    except ValueError:
+        errors.append(f"[{section}] {key} = {raw!r} is not a valid value.")
+        return default
+    if valid and not valid(value):
+        errors.append(f"[{section}] {key} = {raw!r} is out of range.")
+        return default
+    return value
+
+def _boolean(raw):
+    states = configparser.ConfigParser.BOOLEAN_STATES
+    if raw.lower() not in states:
+        raise ValueError(raw)
+    return states[raw.lower()]
+
+def _valid_port(port):
+    return 0 < port < 65536
+
+# Parses and validates the configuration file and compiles it into a FailoverConfig.
+# All errors are collected and reported together in one ConfigError.
+def load_config(path=None):
+    path = path or config_path
+    config = configparser.ConfigParser()
+    try:
+        config.read(path, encoding='utf-8')
+        if not config.sections():
+            raise FileNotFoundError(f"Configuration file {path} is empty or unreadable.")
+        return _compile_config(config, path)
+    except (configparser.Error, UnicodeDecodeError) as e:
+        # Syntax errors and invalid characters while reading, interpolation errors (e.g. a single '%') while accessing values
+        raise ConfigError(f"Invalid configuration {path}: {e}") from e
+
+def _compile_config(config, path):
+    errors = []
+    for section in ('ZONES', 'MX', 'RECORDS', 'PORTS', 'SETTINGS', 'MAIL'):
+        if section not in config:
+            errors.append(f"Section [{section}] is missing.")
+    if errors:
+        raise ConfigError(f"Invalid configuration {path}: " + " ".join(errors))
+
+    # Hosts: mxipN/mxN in [MX] together with the SSH port portN in [PORTS]
+    indices = sorted({int(m.group(1)) for m in map(re.compile(r'mx(?:ip)?(\d+)$').match, config['MX']) if m})
+    if indices != [1, 2]:
+        errors.append("[MX] must define exactly the primary (mxip1, mx1) and standby (mxip2, mx2) host.")
+    hosts = tuple(
+        Host(
+            name=_get(config, 'MX', f'mx{i}', errors),
+            ip=_get(config, 'MX', f'mxip{i}', errors),
+            ssh_port=_get(config, 'PORTS', f'port{i}', errors, int, _valid_port),
+        )
+        for i in (1, 2)
+    )
+
+    records = {key: value.strip() for key, value in config['RECORDS'].items() if value.strip()}
+    if 'record_mx' not in records:
+        errors.append("[RECORDS] record_mx is missing.")
+
+    # Zones: the first zone gets all records, all further zones all records except record_mx.
+    # The optional section [ZONE_RECORDS] overrides this per zone key (e.g. zone2 = smtp, imap).
+    zones = {}
+    zone_records = config['ZONE_RECORDS'] if 'ZONE_RECORDS' in config else {}
+    for key in zone_records:
+        if key not in config['ZONES']:
+            errors.append(f"[ZONE_RECORDS] {key} is not a zone in [ZONES].")
+    for position, (key, zone) in enumerate(config['ZONES'].items()):
+        zone = zone.strip().rstrip('.')
+        if not zone:
+            errors.append(f"[ZONES] {key} is empty.")
+            continue
+        if key in zone_records:
+            names = tuple(name.strip() for name in zone_records[key].split(',') if name.strip())
+            for name in names:
+                if name not in records.values():
+                    errors.append(f"[ZONE_RECORDS] {key}: record {name!r} is not defined in [RECORDS].")
+        elif position == 0:
+            names = tuple(records.values())
+        else:
+            names = tuple(name for name in records.values() if name != records.get('record_mx'))
+        zones[zone] = names
+    if not zones:
+        errors.append("[ZONES] must contain at least one zone.")
+
+    # Service checks: every entry in [PORTS] that is not an SSH port portN
+    service_checks = {
+        key: Check(SERVICE_NAMES.get(key, key.upper()), _get(config, 'PORTS', key, errors, int, _valid_port))
+        for key in config['PORTS']
+        if not re.match(r'port\d+$', key)
+    }
+
+    # TLS checks: the optional section [TLS] names the [PORTS] entries that speak TLS directly.
+    # An empty 'services =' turns the TLS checks off, so it is read directly and not via _get().
+    if 'TLS' in config and 'services' in config['TLS']:
+        tls_services = config['TLS']['services']
+    else:
+        tls_services = ','.join(key for key in TLS_SERVICES if key in service_checks)
+    tls_checks = []
+    for key in (name.strip() for name in tls_services.split(',') if name.strip()):
+        if key in service_checks:
+            tls_checks.append(service_checks[key])
+        else:
+            errors.append(f"[TLS] services: {key!r} is not a service in [PORTS].")
+    tls = TlsSettings(
+        checks=tuple(tls_checks),
+        expiry_days=_get(config, 'TLS', 'expiry_days', errors, int, lambda v: v >= 0, default=14),
+        max_handshake=_get(config, 'TLS', 'max_handshake', errors, float, lambda v: v > 0, default=2.0),
+        server_name=_get(config, 'TLS', 'server_name', errors, default='') or None,
+        cafile=_get(config, 'TLS', 'cafile', errors, default='') or None,
+    )
+    if tls.cafile:
+        try:
+            ssl.create_default_context(cafile=tls.cafile)
+        except (OSError, ValueError) as e:
+            errors.append(f"[TLS] cafile {tls.cafile} cannot be loaded: {e}")
+
+    mail = MailSettings(
+        sender_email=_get(config, 'MAIL', 'sender_email', errors),
+        recipient_email=_get(config, 'MAIL', 'recipient_email', errors),
+        port=_get(config, 'MAIL', 'port', errors, int, _valid_port, default=25),
+        use_tls=_get(config, 'MAIL', 'use_tls', errors, _boolean, default=False),
+        username=config['MAIL'].get('username'),
+        password=config['MAIL'].get('password'),
+    )
+
+    cfg = FailoverConfig(
+        path=path,
+        hosts=hosts,
+        zones=MappingProxyType(zones),
+        records=MappingProxyType(records),
+        checks=tuple(service_checks.values()),
+        ns=_get(config, 'SETTINGS', 'ns', errors),
+        ttl=_get(config, 'SETTINGS', 'ttl', errors, int, lambda v: v > 0),
+        logfile=_get(config, 'SETTINGS', 'logfile', errors),
+        space_limit=_get(config, 'SETTINGS', 'space_limit', errors, int, lambda v: 0 < v <= 100),
+        partition=_get(config, 'SETTINGS', 'partition', errors),
+        user=_get(config, 'SETTINGS', 'user', errors),
+        mail=mail,
+        tls=tls,
+    )
+
+    if errors:
+        raise ConfigError(f"Invalid configuration {path}: " + " ".join(errors))
+    return cfg
+
+CONFIG = load_config(config_path)
+
+# Returns the configuration snapshot that is currently active
+def current_config():
+    return CONFIG
+
+# Loads the configuration again and swaps it in only if it is valid.
+# A cycle that is already running keeps working on its own snapshot.
+def reload_config(path=None):
+    global CONFIG
+    try:
+        new_config = load_config(path or CONFIG.path)
+    except (OSError, ConfigError) as e:
+        logging.error(f"Configuration reload rejected, keeping the current configuration: {e}")
+        return False
+    if new_config.logfile != CONFIG.logfile:
+        logging.warning(f"The logfile changed to {new_config.logfile}; this takes effect after a restart.")
+    # A CA file may have been replaced under the same path; the TLS sessions belong to the old contexts.
+    # With unchanged settings and the system CAs the sessions stay warm.
+    if new_config.tls != CONFIG.tls or new_config.tls.cafile:
+        _tls_contexts.clear()
+        _tls_sessions.clear()
+    CONFIG = new_config
+    logging.info(f"Configuration {new_config.path} reloaded.")
+    return True
 
 # Definition of logging
 logging.basicConfig(
-    filename=logfile, 
+    filename=CONFIG.logfile, 
     level=logging.INFO,
     style="{",
     format="{asctime} [{levelname:8}] [{funcName}] {message}",
@@ -74,22 +282,66 @@ logging.basicConfig(
 
 logging.getLogger("paramiko").setLevel(logging.INFO)
 
+# inotify event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Watches the directory of the configuration file via inotify. The directory is watched
+# instead of the file itself, since editors usually replace the file on saving.
+class ConfigWatcher:
+    def __init__(self, path):
+        self.directory, self.filename = os.path.split(os.path.abspath(path))
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        if libc.inotify_add_watch(self.fd, self.directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch on {self.directory} failed: {os.strerror(errno)}")
+
+    # Waits up to timeout seconds and returns True if the configuration file was written or replaced
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        changed = False
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if name == self.filename:
+                changed = True
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
 # Function for sending mail messages
 def send_mail(mailserver, subject, message, cfg=None):
-    cfg = cfg or mailcfg
+    # cfg is the FailoverConfig snapshot of the running cycle, otherwise the active configuration
+    mail = getattr(cfg, 'mail', None) or current_config().mail
 
     msg = EmailMessage()
     msg['Subject'] = subject
-    msg['From'] = mail_from
-    msg['To'] = mail_to
+    msg['From'] = mail.sender_email
+    msg['To'] = mail.recipient_email
     msg['Date'] = formatdate(localtime=True)
     msg.set_content(message)
 
-    with smtplib.SMTP(mailserver, mail_port) as smtp_conn:
-        if mail_use_tls:
+    with smtplib.SMTP(mailserver, mail.port) as smtp_conn:
+        if mail.use_tls:
             smtp_conn.starttls()
-        if mail_username and mail_password: 
-            smtp_conn.login(mail_username, mail_password)
+        if mail.username and mail.password: 
+            smtp_conn.login(mail.username, mail.password)
         smtp_conn.send_message(msg)    
         
 # Function to map Netcat "nc -zv IP-Adresse Port"
@@ -182,97 +434,159 @@ def service_availability(mxip, port, count, service, record, zone, failovermx, n
         logging.info(f"The {service} service failed on {mxip}. Failover target would be {failovermx}.")
     return count
 
+# TLS contexts per CA file and the TLS sessions of the last handshakes. Sessions are
+# only resumed with the context that created them; in daemon mode they are reused
+# between the cycles so that a check usually costs only an abbreviated handshake.
+# A resumed handshake does not verify the certificate chain again, therefore a full
+# handshake is forced after TLS_MAX_RESUMPTIONS resumptions.
+TLS_MAX_RESUMPTIONS = 5
+_tls_contexts = {}
+_tls_sessions = {}      # key -> (session, number of resumptions)
+_tls_alerted = set()    # certificates whose expiry notification has been sent
+
+def _tls_context(cafile):
+    if cafile not in _tls_contexts:
+        _tls_contexts[cafile] = ssl.create_default_context(cafile=cafile)
+    return _tls_contexts[cafile]
+
+# TLS 1.3 servers send the session ticket only after the handshake. Wait about one
+# handshake time for it, so that the session can be resumed in the next cycle.
+def _read_session_ticket(tls_sock, wait):
+    if select.select([tls_sock], [], [], wait)[0]:
+        tls_sock.setblocking(False)
+        try:
+            tls_sock.recv(4096)
+        except OSError:
+            pass
+
+# Function tls_check performs a TLS handshake with the service and checks handshake time,
+# certificate chain and expiry. Certificates that expire soon and have not been reported yet
+# are added to alerts as (alert key, message); the caller marks them in _tls_alerted once sent.
+def tls_check(host, port, count, service, server_name, tls, alerts, timeout=5):
+    key = (tls.cafile, server_name, host, port)
+    session, resumptions = _tls_sessions.get(key, (None, 0))
+    if resumptions >= TLS_MAX_RESUMPTIONS:
+        session, resumptions = None, 0
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            started = time.monotonic()
+            with _tls_context(tls.cafile).wrap_socket(sock, server_hostname=server_name, session=session) as tls_sock:
+                handshake = time.monotonic() - started
+                cert = tls_sock.getpeercert()
+                version = tls_sock.version()
+                cipher = tls_sock.cipher()[0]
+                reused = tls_sock.session_reused
+                if version == 'TLSv1.3' and not reused:
+                    _read_session_ticket(tls_sock, max(handshake, 0.05))
+                _tls_sessions[key] = (tls_sock.session, resumptions + 1 if reused else 0)
+    except (OSError, ValueError) as e:
+        _tls_sessions.pop(key, None)
+        count += 1
+        logging.error(f"The TLS handshake of the {service} service on host {host} failed: {e}")
+        return count
+
+    logging.info(f"TLS handshake of the {service} service on host {host} took {handshake * 1000:.0f} ms ({version}, {cipher}, session reused: {reused}).")
+    if handshake > tls.max_handshake:
+        count += 1
+        logging.error(f"The TLS handshake of the {service} service on host {host} is too slow with {handshake:.2f} seconds.")
+
+    days_left = int((ssl.cert_time_to_seconds(cert['notAfter']) - time.time()) // 86400)
+    if days_left < tls.expiry_days:
+        # Close to expiry every check does a full, verified handshake
+        _tls_sessions.pop(key, None)
+        if days_left < 0:
+            count += 1
+            logging.error(f"The certificate of the {service} service on host {host} has expired ({cert['notAfter']}).")
+            alert_key = (host, port, cert['notAfter'], 'expired')
+            message = f"The certificate of the {service} service for {server_name} on host {host} has expired ({cert['notAfter']})."
+        else:
+            logging.warning(f"The certificate of the {service} service on host {host} expires in {days_left} days ({cert['notAfter']}).")
+            alert_key = (host, port, cert['notAfter'], 'expiring')
+            message = f"The certificate of the {service} service for {server_name} on host {host} expires in {days_left} days ({cert['notAfter']})."
+        if alert_key not in _tls_alerted:
+            alerts.append((alert_key, message))
+    return count
+
 # Runs nsupdate, in this function, for at least two zones that have different records.
-def nsupdate_cnames(ns, ttl, actualmx, zone1, records_zone1, zone2, records_zone2):
+# Instead of zone1/zone2 a mapping zones (zone -> records) with any number of zones can be passed.
+def nsupdate_cnames(ns, ttl, actualmx, zone1=None, records_zone1=None, zone2=None, records_zone2=None, zones=None):
+    if zones is None:
+        zones = {zone1: records_zone1, zone2: records_zone2}
     if not actualmx.endswith('.'):
         actualmx += '.'
 
     logging.info(f"NS-Server: {ns}")
     logging.info(f"TTL: {ttl}")
     logging.info(f"Target-CNAME: {actualmx}")
-    logging.info(f"Zone 1: {zone1}, Records: {records_zone1}")
-    logging.info(f"Zone 2: {zone2}, Records: {records_zone2}")
-
-
-    # Zone 1
-    update = dns.update.Update(zone1)
-    logging.info(f"Preparing update for zone: {zone1}")
-    for record in records_zone1:
-        fqdn = f"{record}.{zone1}."
-        logging.info(f" - Updating CNAME {fqdn} to {actualmx}")
-        update.delete(fqdn, 'CNAME')
-        update.add(fqdn, ttl, 'CNAME', actualmx)
-
-    logging.info(f"Sending update to {ns} for zone {zone1}...")
-    try:
-        response = dns.query.tcp(update, ns, timeout=5)
-        rcode = response.rcode()
-        logging.info(f"Response for {zone1}: {dns.rcode.to_text(rcode)}")
-        if rcode != 0:
-            logging.error(f"Error updating zone {zone1}")
-            return False
-    except dns.exception.DNSException as e:
-        logging.error(f"Exception while updating {zone1}: {e}")
-        return False
-
-    # Zone 2
-    update2 = dns.update.Update(zone2)
-    logging.info(f"Preparing update for zone: {zone2}")
-    for record in records_zone2:
-        fqdn = f"{record}.{zone2}."
-        logging.info(f" - Updating CNAME {fqdn} to {actualmx}")
-        update2.delete(fqdn, 'CNAME')
-        update2.add(fqdn, ttl, 'CNAME', actualmx)
-
-    try:
-        response2 = dns.query.tcp(update2, ns, timeout=5)
-        rcode2 = response2.rcode()
-        logging.info(f"Response for {zone2}: {dns.rcode.to_text(rcode2)}")
-        if rcode2 != 0:
-            logging.error(f"Error updating zone {zone2}")
+    for number, (zone, records) in enumerate(zones.items(), start=1):
+        logging.info(f"Zone {number}: {zone}, Records: {list(records)}")
+
+    for zone, records in zones.items():
+        update = dns.update.Update(zone)
+        logging.info(f"Preparing update for zone: {zone}")
+        for record in records:
+            fqdn = f"{record}.{zone}."
+            logging.info(f" - Updating CNAME {fqdn} to {actualmx}")
+            update.delete(fqdn, 'CNAME')
+            update.add(fqdn, ttl, 'CNAME', actualmx)
+
+        logging.info(f"Sending update to {ns} for zone {zone}...")
+        try:
+            response = dns.query.tcp(update, ns, timeout=5)
+            rcode = response.rcode()
+            logging.info(f"Response for {zone}: {dns.rcode.to_text(rcode)}")
+            if rcode != 0:
+                logging.error(f"Error updating zone {zone}")
+                return False
+        except dns.exception.DNSException as e:
+            logging.error(f"Exception while updating {zone}: {e}")
             return False
-    except dns.exception.DNSException as e:
-        logging.error(f"Exception while updating {zone2}: {e}")
-        return False
 
     logging.info(f"DNS update finished successfully!")
-    return True              
+    return True
+
+def main(cfg=None):
+    # The whole cycle works on one configuration snapshot, even if a reload happens meanwhile.
+    cfg = cfg or current_config()
+    primary, standby = cfg.hosts
+    mx1, mx2 = primary.name, standby.name
+    ns = cfg.ns
 
-def main():
     logging.info(f"==== Start DNS-Failover ====")
-    # Availability tests of the two hosts for the services SMTP, IMAPs and HTTPs. 
+    # Availability tests of the two hosts for the services configured in [PORTS] (SMTP, IMAPs, HTTPs, MySQL). 
     # The existence of the MySQL socket and the storage capacity of the partition are also checked.
     # The goal is that as soon as one of the services on Mailserver1 fails, Mailserver2 takes over completely.
     # The counter count1 reflects the state of mail server 1, analogous to the counter count2.
     count1 = 0
     count2 = 0
 
-    count1 = service_availability(mxip1, smtp,  count1, "SMTP",  record_smtp, zone1, mx2, ns)
-    count2 = service_availability(mxip2, smtp,  count2, "SMTP",  record_smtp, zone1, mx1, ns)
-    count1 = service_availability(mxip1, imaps, count1, "IMAPs", record_imap, zone1, mx2, ns)
-    count2 = service_availability(mxip2, imaps, count2, "IMAPs", record_imap, zone1, mx1, ns)
-    count1 = service_availability(mxip1, https, count1, "HTTPs", record_mail, zone1, mx2, ns)
-    count2 = service_availability(mxip2, https, count2, "HTTPs", record_mail, zone1, mx1, ns)
-    count1 = service_availability(mxip1, mysql, count1, "MySQL", record_mail, zone1, mx2, ns)
-    count2 = service_availability(mxip2, mysql, count2, "MySQL", record_mail, zone1, mx1, ns)
+    for check in cfg.checks:
+        count1 = service_availability(primary.ip, check.port, count1, check.service, cfg.mx_record, cfg.primary_zone, mx2, ns)
+        count2 = service_availability(standby.ip, check.port, count2, check.service, cfg.mx_record, cfg.primary_zone, mx1, ns)
+
+    # The TLS checks count handshake failures, invalid certificates and slow handshakes.
+    # Certificates that expire soon only lead to a notification.
+    alerts = []
+    for check in cfg.tls.checks:
+        count1 = tls_check(primary.ip, check.port, count1, check.service, cfg.tls.server_name or mx1, cfg.tls, alerts)
+        count2 = tls_check(standby.ip, check.port, count2, check.service, cfg.tls.server_name or mx2, cfg.tls, alerts)
 
-    count1 = mysql_socket(mxip1, user, port1, count1)
-    count2 = mysql_socket(mxip2, user, port2, count2)
+    count1 = mysql_socket(primary.ip, cfg.user, primary.ssh_port, count1)
+    count2 = mysql_socket(standby.ip, cfg.user, standby.ssh_port, count2)
 
-    count1 = fetchDiskUsage(mxip1, user, port1, partition, count1, space_limit)
-    count2 = fetchDiskUsage(mxip2, user, port2, partition, count2, space_limit)
+    count1 = fetchDiskUsage(primary.ip, cfg.user, primary.ssh_port, cfg.partition, count1, cfg.space_limit)
+    count2 = fetchDiskUsage(standby.ip, cfg.user, standby.ssh_port, cfg.partition, count2, cfg.space_limit)
 
-    count1 = checkInodes(mxip1, user, port1, count1)
-    count2 = checkInodes(mxip2, user, port2, count2)
+    count1 = checkInodes(primary.ip, cfg.user, primary.ssh_port, count1)
+    count2 = checkInodes(standby.ip, cfg.user, standby.ssh_port, count2)
 
     # Decision logic about which host has failed and should be replaced by the other host.
     # Host 1 is the default state and must be restored after a DNS failover if reachable.
-    records_zone1 = [record_mx, record_smtp, record_imap, record_mail, record_pop3]
-    records_zone2 = [record_smtp, record_imap, record_mail, record_pop3]
+    mx_fqdn = f"{cfg.mx_record}.{cfg.primary_zone}"
 
     if count1 == 0 and count2 == 0:
         # Both online → CNAME must point to MX1
-        if get_cname(f"{record_mx}.{zone1}", ns) == mx1:
+        if get_cname(mx_fqdn, ns) == mx1:
             logging.info(f"Both servers online, CNAME correctly points to {mx1}. Nothing to do.")
         else:
             logging.info(f"Both servers online, but CNAME does not point to {mx1}. Correcting...")
@@ -282,13 +596,13 @@ def main():
                 f"Failover is switching to {mx1}.\n"
                 f"An nsupdate is being issued on name server {ns}."
             )
-            nsupdate_cnames(ns, ttl, mx1, zone1, records_zone1, zone2, records_zone2)
-            send_mail(mx1, f"The mail server {mx1} is back online!", notice)
+            nsupdate_cnames(ns, cfg.ttl, mx1, zones=cfg.zones)
+            send_mail(mx1, f"The mail server {mx1} is back online!", notice, cfg)
 
     elif count1 != 0 and count2 == 0:
         # MX2 online only → Failover to MX2
         logging.info(f"{mx1} is offline, failing over to {mx2}.")
-        current_cname = get_cname(f"{record_mx}.{zone1}", ns)
+        current_cname = get_cname(mx_fqdn, ns)
         if current_cname == mx2:
             logging.info(f"{mx1} is still offline. DNS already points to {mx2}. No action required.")
             notice = (
@@ -296,7 +610,7 @@ def main():
                 f"The CNAME records are already pointing to {mx2}.\n"
                 f"An nsupdate has already been performed on the nameserver. {ns}."
             )
-            send_mail(mx2, f"The mail server {mx1} is still offline and waiting to go online!", notice)
+            send_mail(mx2, f"The mail server {mx1} is still offline and waiting to go online!", notice, cfg)
         else:
             notice = (
                 f"{mx1} is currently offline!\n"
@@ -304,12 +618,12 @@ def main():
                 f"Failover is switching to {mx2}.\n"
                 f"An nsupdate is being issued on name server {ns}."
             )
-            nsupdate_cnames(ns, ttl, mx2, zone1, records_zone1, zone2, records_zone2)
-            send_mail(mx2, f"The mail server {mx1} is down!", notice)
+            nsupdate_cnames(ns, cfg.ttl, mx2, zones=cfg.zones)
+            send_mail(mx2, f"The mail server {mx1} is down!", notice, cfg)
 
     elif count1 == 0 and count2 != 0:
         # Only MX1 online → CNAME on MX1
-        current_cname = get_cname(f"{record_mx}.{zone1}", ns)
+        current_cname = get_cname(mx_fqdn, ns)
         if current_cname == mx1:
             logging.info(f"{mx2} is still offline. DNS already points to {mx1}. No action required.")
             notice = (
@@ -317,7 +631,7 @@ def main():
                 f"The CNAME records are already pointing to {mx1}.\n"
                 f"An nsupdate has already been performed on the nameserver. {ns}."
             )
-            send_mail(mx1, f"The mail server {mx2} is still offline and waiting to go online!", notice)
+            send_mail(mx1, f"The mail server {mx2} is still offline and waiting to go online!", notice, cfg)
         else:
             logging.info(f"{mx2} is offline, switching back to {mx1}.")
             notice = (
@@ -326,18 +640,61 @@ def main():
                 f"Failover is switching to {mx1}.\n"
                 f"An nsupdate is being issued on name server {ns}."
             )
-            nsupdate_cnames(ns, ttl, mx1, zone1, records_zone1, zone2, records_zone2)
-            send_mail(mx1, f"The mail server {mx2} is down!", notice)
+            nsupdate_cnames(ns, cfg.ttl, mx1, zones=cfg.zones)
+            send_mail(mx1, f"The mail server {mx2} is down!", notice, cfg)
 
     else:
         # Both offline → Error state
         logging.error(f"Both servers offline! No action possible.")
 
+    # The alerts are only marked as sent after the mail went out, otherwise they are repeated next cycle.
+    if alerts and (count1 == 0 or count2 == 0):
+        send_mail(mx1 if count1 == 0 else mx2, "TLS certificates expire soon or have expired!", "\n".join(message for _, message in alerts), cfg)
+        _tls_alerted.update(alert_key for alert_key, _ in alerts)
+
     logging.info(f"==== DNS-Failover has been completed ====")                   
 
+# Runs main() every interval seconds as a long-running process and reloads the
+# configuration between the cycles as soon as inotify reports a change.
+def run_forever(interval):
+    watcher = ConfigWatcher(current_config().path)
+    logging.info(f"Running as daemon every {interval} seconds, watching {current_config().path}.")
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                main()
+            except Exception as e:
+                logging.error(f"Fatal error: {e}")
+            remaining = started + interval - time.monotonic()
+            while remaining > 0:
+                if watcher.wait(remaining):
+                    try:
+                        reload_config()
+                    except Exception as e:
+                        logging.error(f"Configuration reload failed, keeping the current configuration: {e}")
+                remaining = started + interval - time.monotonic()
+    finally:
+        watcher.close()
+
+# argparse type for --interval, a value of 0 would run the checks without any pause
+def _positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number of seconds")
+    return number
+
 # Main programm
 if __name__ == "__main__":
-    try:
-        main()
-    except Exception as e:
-        logging.error(f"Fatal error: {e}")
+    parser = argparse.ArgumentParser(description="DNS failover for a redundant mail server pair.")
+    parser.add_argument("--daemon", action="store_true", help="run continuously and reload the configuration on change")
+    parser.add_argument("--interval", type=_positive_int, default=600, help="seconds between two checks in daemon mode (default: 600)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_forever(args.interval)
+    else:
+        try:
+            main()
+        except Exception as e:
+            logging.error(f"Fatal error: {e}")
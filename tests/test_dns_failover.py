@@ -12,6 +12,17 @@ from DNS_Failover import nsupdate_cnames
 from DNS_Failover import send_mail
 from DNS_Failover import checkInodes
 from DNS_Failover import main
+from DNS_Failover import load_config
+from DNS_Failover import reload_config
+from DNS_Failover import current_config
+from DNS_Failover import ConfigError
+from DNS_Failover import ConfigWatcher
+from DNS_Failover import TlsSettings
+from DNS_Failover import tls_check
+from DNS_Failover import TLS_MAX_RESUMPTIONS
+import DNS_Failover
+import ssl
+import time
 import dns.resolver
 
 """
@@ -320,18 +331,20 @@ def test_checkInodes_failure(mock_ssh_client_class):
 # Testing main function
 @patch('smtplib.SMTP')
 @patch('DNS_Failover.checkInodes')
+@patch('DNS_Failover.tls_check')
 @patch('DNS_Failover.fetchDiskUsage')
 @patch('DNS_Failover.mysql_socket')
 @patch('DNS_Failover.service_availability')
 @patch('DNS_Failover.get_cname')
 @patch('DNS_Failover.nsupdate_cnames')
-def test_main(mock_nsupdate_cnames, mock_get_cname, mock_service_availability, mock_mysql_socket, mock_fetchDiskUsage, mock_checkInodes, mock_smtp):
+def test_main(mock_nsupdate_cnames, mock_get_cname, mock_service_availability, mock_mysql_socket, mock_fetchDiskUsage, mock_tls_check, mock_checkInodes, mock_smtp):
     mock_get_cname.return_value = "target-mx.example."
     mock_nsupdate_cnames.return_value = True
     mock_service_availability.return_value = 0
     mock_mysql_socket.return_value = 0
     mock_fetchDiskUsage.return_value = 0
     mock_checkInodes.return_value = 0
+    mock_tls_check.return_value = 0
 
     main()
 
@@ -339,5 +352,286 @@ def test_main(mock_nsupdate_cnames, mock_get_cname, mock_service_availability, m
     assert mock_mysql_socket.call_count > 0
     assert mock_fetchDiskUsage.call_count > 0
     assert mock_checkInodes.call_count > 0
+    assert mock_tls_check.call_count > 0
     assert mock_get_cname.call_count > 0
-    assert mock_nsupdate_cnames.call_count >= 0
\ No newline at end of file
+    assert mock_nsupdate_cnames.call_count >= 0
+
+# Testing function load_config()
+def test_load_config_compiles_tables():
+    cfg = load_config(CONFIG_PATH)
+
+    primary, standby = cfg.hosts
+    assert primary.ip and standby.ip
+    assert cfg.primary_zone == list(cfg.zones)[0]
+    assert cfg.mx_record in cfg.zones[cfg.primary_zone]
+    assert all(cfg.mx_record not in records for records in list(cfg.zones.values())[1:])
+    assert [check.service for check in cfg.checks] == ["SMTP", "IMAPs", "HTTPs", "MySQL"]
+    assert [check.service for check in cfg.tls.checks] == ["IMAPs", "HTTPs"]
+    with pytest.raises(TypeError):
+        cfg.zones["new.tld"] = ("mx",)
+
+def test_load_config_zone_records(tmp_path):
+    cfg = configparser.ConfigParser()
+    cfg.read(CONFIG_PATH)
+    cfg['ZONES']['zone3'] = 'domain3.tld'
+    cfg['ZONE_RECORDS'] = {'zone3': 'smtp, imap'}
+    path = tmp_path / "config.cfg"
+    with open(path, "w") as f:
+        cfg.write(f)
+
+    assert load_config(str(path)).zones['domain3.tld'] == ("smtp", "imap")
+
+def test_load_config_invalid(tmp_path):
+    cfg = configparser.ConfigParser()
+    cfg.read(CONFIG_PATH)
+    cfg['SETTINGS']['ttl'] = 'sixty'
+    cfg['PORTS']['smtp'] = '99999'
+    del cfg['SETTINGS']['ns']
+    path = tmp_path / "config.cfg"
+    with open(path, "w") as f:
+        cfg.write(f)
+
+    with pytest.raises(ConfigError) as excinfo:
+        load_config(str(path))
+    assert "ttl" in str(excinfo.value)
+    assert "smtp" in str(excinfo.value)
+    assert "ns is missing" in str(excinfo.value)
+
+# Testing function reload_config()
+def test_reload_config_keeps_current_on_error(tmp_path):
+    path = tmp_path / "config.cfg"
+    path.write_text("[ZONES]\nzone1 = domain1.tld\n")
+    before = current_config()
+
+    assert reload_config(str(path)) is False
+    assert current_config() is before
+
+@pytest.mark.parametrize("content", [
+    "[ZONES]\nzone1 = domain1.tld\n[ZONES]\n",
+    "[ZONES]\nzone1 = domain1.tld\nno ini line\n",
+    "[MAIL]\npassword = ab%c\n",
+])
+def test_load_config_syntax_error(tmp_path, content):
+    path = tmp_path / "config.cfg"
+    path.write_text(content)
+    before = current_config()
+
+    with pytest.raises(ConfigError):
+        load_config(str(path))
+    assert reload_config(str(path)) is False
+    assert current_config() is before
+
+def test_reload_config_invalid_encoding(tmp_path):
+    path = tmp_path / "config.cfg"
+    path.write_bytes(b"[ZONES]\nzone1 = dom\xff\xfeain1.tld\n")
+    before = current_config()
+
+    with pytest.raises(ConfigError):
+        load_config(str(path))
+    assert reload_config(str(path)) is False
+    assert current_config() is before
+
+def test_load_config_unknown_zone_records(tmp_path):
+    cfg = configparser.ConfigParser()
+    cfg.read(CONFIG_PATH)
+    cfg['ZONE_RECORDS'] = {'zon3': 'smtp'}
+    path = tmp_path / "config.cfg"
+    with open(path, "w") as f:
+        cfg.write(f)
+
+    with pytest.raises(ConfigError, match="zon3"):
+        load_config(str(path))
+
+# Testing class ConfigWatcher
+def test_config_watcher(tmp_path):
+    path = tmp_path / "config.cfg"
+    path.write_text("")
+    watcher = ConfigWatcher(str(path))
+    try:
+        (tmp_path / "other.cfg").write_text("")
+        assert watcher.wait(0.1) is False
+        path.write_text("[ZONES]\n")
+        assert watcher.wait(1) is True
+    finally:
+        watcher.close()
+
+# Testing function tls_check()
+TLS = TlsSettings(checks=(), expiry_days=14, max_handshake=2.0, server_name=None, cafile=None)
+
+@pytest.fixture(autouse=True)
+def clear_tls_caches():
+    for cache in (DNS_Failover._tls_sessions, DNS_Failover._tls_alerted, DNS_Failover._tls_contexts):
+        cache.clear()
+    yield
+    for cache in (DNS_Failover._tls_sessions, DNS_Failover._tls_alerted, DNS_Failover._tls_contexts):
+        cache.clear()
+
+def mock_tls_socket(mock_context, days_left=90):
+    not_after = time.strftime("%b %d %H:%M:%S %Y GMT", time.gmtime(time.time() + days_left * 86400))
+    tls_sock = MagicMock()
+    tls_sock.getpeercert.return_value = {'notAfter': not_after}
+    tls_sock.version.return_value = "TLSv1.2"
+    tls_sock.cipher.return_value = ("ECDHE-RSA-AES256-GCM-SHA384", "TLSv1.2", 256)
+    tls_sock.session_reused = False
+    mock_context.return_value.wrap_socket.return_value.__enter__.return_value = tls_sock
+    return tls_sock
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_success(mock_conn, mock_context):
+    mock_tls_socket(mock_context)
+    alerts = []
+
+    assert tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, alerts) == 0
+    assert alerts == []
+    assert mock_context.return_value.wrap_socket.call_args.kwargs['server_hostname'] == "mx1.example.com"
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_reuses_session(mock_conn, mock_context):
+    tls_sock = mock_tls_socket(mock_context)
+
+    tls_check("1.2.3.4", 443, 0, "HTTPs", "mx2.example.com", TLS, [])
+    tls_check("1.2.3.4", 443, 0, "HTTPs", "mx2.example.com", TLS, [])
+
+    assert mock_context.return_value.wrap_socket.call_args.kwargs['session'] is tls_sock.session
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_expiry_alert(mock_conn, mock_context):
+    mock_tls_socket(mock_context, days_left=5)
+    alerts = []
+
+    assert tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, alerts) == 0
+    assert len(alerts) == 1
+    assert mock_context.return_value.wrap_socket.call_args.kwargs['session'] is None
+
+    # Once the alert has been sent it is not repeated
+    DNS_Failover._tls_alerted.add(alerts[0][0])
+    alerts = []
+    assert tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, alerts) == 0
+    assert alerts == []
+    assert mock_context.return_value.wrap_socket.call_args.kwargs['session'] is None
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_expired_certificate(mock_conn, mock_context):
+    mock_tls_socket(mock_context, days_left=-2)
+    alerts = []
+
+    assert tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, alerts) == 1
+    assert "has expired" in alerts[0][1]
+
+    # An earlier "expires soon" alert does not suppress the expiry alert
+    DNS_Failover._tls_alerted.add(alerts[0][0][:3] + ('expiring',))
+    alerts = []
+    tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, alerts)
+    assert len(alerts) == 1
+
+@patch('DNS_Failover.select.select')
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_reads_tls13_session_ticket(mock_conn, mock_context, mock_select):
+    tls_sock = mock_tls_socket(mock_context)
+    tls_sock.version.return_value = "TLSv1.3"
+    tls_sock.recv.side_effect = ssl.SSLWantReadError()
+    mock_select.return_value = ([tls_sock], [], [])
+
+    assert tls_check("1.2.3.4", 443, 0, "HTTPs", "mx1.example.com", TLS, []) == 0
+
+    mock_select.assert_called_once()
+    tls_sock.setblocking.assert_called_once_with(False)
+    tls_sock.recv.assert_called_once()
+    session, resumptions = DNS_Failover._tls_sessions[(None, "mx1.example.com", "1.2.3.4", 443)]
+    assert session is tls_sock.session
+    assert resumptions == 0
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_forces_full_handshake(mock_conn, mock_context):
+    tls_sock = mock_tls_socket(mock_context)
+    tls_sock.session_reused = True
+    sessions = []
+
+    for _ in range(TLS_MAX_RESUMPTIONS + 3):
+        tls_check("1.2.3.4", 443, 0, "HTTPs", "mx1.example.com", TLS, [])
+        sessions.append(mock_context.return_value.wrap_socket.call_args.kwargs['session'])
+
+    assert sessions[0] is None
+    assert sessions[TLS_MAX_RESUMPTIONS] is None
+    assert sessions.count(None) == 2
+
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_failure(mock_conn, mock_context):
+    mock_context.return_value.wrap_socket.side_effect = ssl.SSLCertVerificationError("certificate has expired")
+
+    assert tls_check("1.2.3.4", 443, 0, "HTTPs", "mx1.example.com", TLS, []) == 1
+
+@patch('DNS_Failover.time.monotonic', side_effect=[100.0, 103.0])
+@patch('DNS_Failover._tls_context')
+@patch('socket.create_connection')
+def test_tls_check_slow_handshake(mock_conn, mock_context, mock_monotonic):
+    mock_tls_socket(mock_context)
+
+    assert tls_check("1.2.3.4", 993, 0, "IMAPs", "mx1.example.com", TLS, []) == 1
+
+# Testing that expiry alerts are only marked as sent after send_mail succeeded
+def add_expiry_alert(host, port, count, service, server_name, tls, alerts):
+    alerts.append(((host, port, "Jan 01 00:00:00 2030 GMT"), f"Certificate of {host} expires soon."))
+    return count
+
+@patch('DNS_Failover.send_mail')
+@patch('DNS_Failover.checkInodes', return_value=0)
+@patch('DNS_Failover.tls_check', side_effect=add_expiry_alert)
+@patch('DNS_Failover.fetchDiskUsage', return_value=0)
+@patch('DNS_Failover.mysql_socket', return_value=0)
+@patch('DNS_Failover.service_availability', return_value=0)
+@patch('DNS_Failover.get_cname')
+def test_main_marks_alerts_after_mail(mock_get_cname, mock_service_availability, mock_mysql_socket, mock_fetchDiskUsage, mock_tls_check, mock_checkInodes, mock_send_mail):
+    mock_get_cname.return_value = current_config().hosts[0].name
+    mock_send_mail.side_effect = OSError("SMTP unavailable")
+    with pytest.raises(OSError):
+        main()
+    assert DNS_Failover._tls_alerted == set()
+
+    mock_send_mail.side_effect = None
+    main()
+    assert mock_send_mail.call_args.args[1] == "TLS certificates expire soon or have expired!"
+    assert len(DNS_Failover._tls_alerted) == 2 * len(current_config().tls.checks)
+
+# Testing the [TLS] section in load_config() and reload_config()
+def write_tls_config(tmp_path, **tls):
+    cfg = configparser.ConfigParser()
+    cfg.read(CONFIG_PATH)
+    cfg['TLS'] = tls
+    path = tmp_path / "config.cfg"
+    with open(path, "w") as f:
+        cfg.write(f)
+    return str(path)
+
+def test_load_config_tls_disabled(tmp_path):
+    path = write_tls_config(tmp_path, services='')
+
+    assert load_config(path).tls.checks == ()
+
+def test_load_config_tls_invalid_cafile(tmp_path):
+    cafile = tmp_path / "ca.pem"
+    cafile.write_text("no certificate")
+    path = write_tls_config(tmp_path, cafile=str(cafile))
+
+    with pytest.raises(ConfigError, match="cafile"):
+        load_config(path)
+
+def test_reload_config_clears_tls_cache(tmp_path):
+    path = write_tls_config(tmp_path, services='imaps')
+    DNS_Failover._tls_contexts[None] = MagicMock()
+    DNS_Failover._tls_sessions[(None, "mx1.example.com", "1.2.3.4", 993)] = (MagicMock(), 0)
+    before = current_config()
+
+    try:
+        assert reload_config(path) is True
+        assert DNS_Failover._tls_contexts == {}
+        assert DNS_Failover._tls_sessions == {}
+    finally:
+        DNS_Failover.CONFIG = before